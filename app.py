@@ -1,11 +1,47 @@
 import streamlit as st
 import google.generativeai as genai
-from typing import Optional
+from typing import Callable, Iterator, NamedTuple, Optional
 from dotenv import load_dotenv
 import os
 import time  # For retries
+import random
 import json  # Fixes UnboundLocalError
-from tenacity import retry, stop_after_attempt, wait_exponential  # tenacity>=8.0.0
+import asyncio  # Batch mode
+import re
+import hashlib
+import sqlite3  # Semantic cache persistence
+import threading
+import io
+from xml.sax.saxutils import escape  # reportlab Paragraph parses markup
+import numpy as np
+import diskcache  # Persistent exact-match caches
+from google.api_core import exceptions as google_exceptions
+from tenacity import retry, retry_if_exception_type  # tenacity>=8.0.0
+
+# Optional: local embeddings for the semantic sentiment cache (skipped if not installed)
+try:
+    from sentence_transformers import SentenceTransformer
+    HAVE_SENTENCE_TRANSFORMERS = True
+except ImportError:
+    HAVE_SENTENCE_TRANSFORMERS = False
+
+# Optional: PDF export (falls back to TXT if not installed); resolved once, not on every export
+try:
+    from reportlab.lib.pagesizes import letter
+    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
+    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+    from reportlab.lib.units import inch
+    from reportlab.lib.colors import HexColor
+    HAVE_REPORTLAB = True
+except ImportError:
+    HAVE_REPORTLAB = False
+
+# Optional: VADER lexicon for the local sentiment fast path (skipped if not installed)
+try:
+    from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
+    HAVE_VADER = True
+except ImportError:
+    HAVE_VADER = False
 
 # Load .env (local fallback)
 load_dotenv()
@@ -20,136 +56,727 @@ genai.configure(api_key=api_key)
 
 # Dynamic model selection (defaults to 2.5 Flash for speed/stability)
 model_name = st.sidebar.selectbox("Gemini Model", ["gemini-2.5-flash", "gemini-2.5-pro"], index=0)
-model = genai.GenerativeModel(model_name)
 
-@st.cache_data(ttl=300)  # 5-min TTL for freshness
-@retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=4, max=10))
-def get_sentiment(text: str) -> str:
+# Retry only transient failures (5xx, 429, timeouts); bad JSON or empty output fails fast
+TRANSIENT_ERRORS = (
+    google_exceptions.ServiceUnavailable,
+    google_exceptions.InternalServerError,
+    google_exceptions.DeadlineExceeded,
+    google_exceptions.ResourceExhausted,
+    TimeoutError,
+)
+RETRY_ATTEMPTS = 3
+RETRY_INITIAL = 1  # Seconds; doubles per attempt
+RETRY_MAX = 8
+
+def retry_after_seconds(exc: Optional[BaseException]) -> Optional[float]:
+    """Server-suggested delay from a 429's RetryInfo detail, if present."""
+    for detail in getattr(exc, "details", None) or []:
+        delay = getattr(detail, "retry_delay", None)
+        if delay is not None:
+            return delay.seconds + delay.nanos / 1e9
+    return None
+
+def should_retry(attempt: int, exc: Optional[BaseException] = None) -> bool:
+    """Attempts left, and the server isn't asking us to wait longer than RETRY_MAX (fail fast instead)."""
+    return attempt + 1 < RETRY_ATTEMPTS and (retry_after_seconds(exc) or 0) <= RETRY_MAX
+
+def backoff_delay(attempt: int, exc: Optional[BaseException] = None) -> float:
+    """Honor Retry-After when Gemini sends one, else exponential backoff with jitter (attempt is 0-based)."""
+    delay = retry_after_seconds(exc)
+    if delay is None:
+        delay = RETRY_INITIAL * 2 ** attempt + random.uniform(0, 1)
+    return min(delay, RETRY_MAX)
+
+gemini_retry = retry(
+    stop=lambda retry_state: not should_retry(retry_state.attempt_number - 1, retry_state.outcome.exception()),
+    wait=lambda retry_state: backoff_delay(retry_state.attempt_number - 1, retry_state.outcome.exception()),
+    retry=retry_if_exception_type(TRANSIENT_ERRORS),
+    reraise=True,
+)
+
+@st.cache_resource
+def get_model(name: str, system_instruction: Optional[str] = None) -> genai.GenerativeModel:
+    """Built once per process per (name, system_instruction); reruns reuse the same client."""
+    return genai.GenerativeModel(name, system_instruction=system_instruction)
+
+# Cache settings: everything persists under CACHE_DIR across sessions and restarts
+CACHE_DIR = os.getenv("CACHE_DIR", "/tmp/ai_text_generator")
+KV_CACHE_PATH = os.path.join(CACHE_DIR, "kv")  # Exact-match sentiment/generation caches
+KV_CACHE_SIZE_LIMIT = 500 * 1024 ** 2  # 500 MB, LRU-evicted
+SEMANTIC_CACHE_PATH = os.path.join(CACHE_DIR, "semantic_cache.sqlite3")
+SEMANTIC_MAX_ENTRIES = 50_000  # Oldest rows evicted beyond this
+SEMANTIC_EVICT_TO = 0.9  # Fraction of SEMANTIC_MAX_ENTRIES kept after an eviction pass
+SEMANTIC_SIMILARITY_THRESHOLD = 0.92
+EMBEDDING_MODEL = "all-MiniLM-L6-v2"  # 384-dim, fast on CPU
+
+# Adaptive TTL: stable opinions live long, time-sensitive inputs expire fast
+BASE_TTL = 24 * 60 * 60  # 24h for short opinion text
+VOLATILE_TTL = 60  # Dates, "today", "now", etc.
+NUMERIC_TTL = 60 * 60  # 1h
+LONG_TEXT_CHARS = 280
+DATE_PATTERN = re.compile(
+    r"\b(?:19|20)\d{2}\b|\b(?:today|tonight|now|currently|yesterday|tomorrow|this (?:week|month|year)|latest)\b",
+    re.IGNORECASE,
+)
+NUMBER_PATTERN = re.compile(r"\d")  # Any digit: prices, counts, scores
+
+# Local prompt guards, checked before any cache, retry or network call
+MIN_PROMPT_CHARS = 3
+MAX_PROMPT_CHARS = int(os.getenv("MAX_PROMPT_CHARS", "2000"))
+
+def prompt_length_error(text: str) -> Optional[str]:
+    """User-facing message if the prompt is too short or too long to send, else None."""
+    if len(text.strip()) < MIN_PROMPT_CHARS:
+        return f"Please enter a prompt (at least {MIN_PROMPT_CHARS} characters)."
+    if len(text) > MAX_PROMPT_CHARS:
+        return f"Prompt is too long ({len(text)} characters; max {MAX_PROMPT_CHARS}). Please shorten it."
+    return None
+
+def validate_prompt(text: str) -> None:
+    """Raise ValueError (with the user-facing message) for prompts that must not reach Gemini."""
+    error = prompt_length_error(text)
+    if error:
+        raise ValueError(error)
+
+def normalize_text(text: str) -> str:
+    """Lowercase and collapse whitespace so trivial edits map to the same cache entry."""
+    return " ".join(text.lower().split())
+
+def adaptive_ttl(text: str) -> float:
+    """Seconds a result derived from `text` stays fresh."""
+    if DATE_PATTERN.search(text):
+        return VOLATILE_TTL
+    if NUMBER_PATTERN.search(text):
+        return NUMERIC_TTL
+    return BASE_TTL if len(text) <= LONG_TEXT_CHARS else BASE_TTL / 4
+
+def cache_digest(key) -> str:
+    """Stable 16-byte blake2b digest (hex) for cache keys; str keys are expected pre-normalized."""
+    data = key.encode() if isinstance(key, str) else repr(key).encode()
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+class PromptKey(NamedTuple):
+    """A prompt normalized, hashed and TTL-classified once; every cache layer keys on this."""
+    normalized: str
+    digest: str
+    ttl: float
+
+def prompt_key(text: str) -> PromptKey:
+    normalized = normalize_text(text)
+    return PromptKey(normalized, cache_digest(normalized), adaptive_ttl(text))
+
+class PersistentTTLCache:
+    """
+    Exact-match cache persisted with diskcache, so entries survive process/container restarts.
+    Keyed on precomputed blake2b digests; every entry carries its own (adaptive) expiry.
+    """
+    def __init__(self, store: diskcache.Cache, namespace: str):
+        self._store = store  # Thread- and process-safe
+        self.namespace = namespace
+
+    def get(self, digest: str):
+        return self._store.get(f"{self.namespace}:{digest}")
+
+    def set(self, digest: str, value, ttl: float) -> None:
+        self._store.set(f"{self.namespace}:{digest}", value, expire=ttl)
+
+@st.cache_resource
+def get_disk_cache() -> diskcache.Cache:
+    """Shared on-disk store for both exact-match caches, capped with LRU eviction."""
+    return diskcache.Cache(
+        KV_CACHE_PATH,
+        size_limit=KV_CACHE_SIZE_LIMIT,
+        eviction_policy="least-recently-used",
+    )
+
+@st.cache_resource
+def get_sentiment_cache() -> PersistentTTLCache:
+    return PersistentTTLCache(get_disk_cache(), "sentiment")
+
+@st.cache_resource
+def get_generation_cache() -> PersistentTTLCache:
+    return PersistentTTLCache(get_disk_cache(), "generation")
+
+class SemanticCache:
+    """
+    Nearest-neighbour sentiment cache over MiniLM embeddings, stored in SQLite.
+    Embeddings are L2-normalized, so a dot product is the cosine similarity.
+    """
+    def __init__(self, path: str, embedder, threshold: float = SEMANTIC_SIMILARITY_THRESHOLD, max_entries: int = SEMANTIC_MAX_ENTRIES):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.embedder = embedder
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self._lock = threading.Lock()  # Streamlit sessions run on separate threads
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries (embedding BLOB NOT NULL, label TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+        self._conn.execute("DELETE FROM entries WHERE expires_at <= ?", (time.time(),))
+        self._conn.commit()
+        rows = self._conn.execute("SELECT rowid, embedding, label, expires_at FROM entries ORDER BY rowid").fetchall()
+        # Preallocated, rowid-ordered buffers; only the first _size rows are live
+        dim = embedder.get_sentence_embedding_dimension()
+        self._size = 0
+        self._rowids = np.empty(0, dtype=np.int64)
+        self._vectors = np.empty((0, dim), dtype=np.float32)
+        self._labels = []
+        self._expires_at = np.empty(0, dtype=np.float64)
+        self._reserve(len(rows))
+        for rowid, blob, label, expires_at in rows:
+            self._append(rowid, np.frombuffer(blob, dtype=np.float32), label, expires_at)
+
+    def _reserve(self, needed: int) -> None:
+        """Grow capacity geometrically so inserts are amortized O(dim), not a full-matrix copy."""
+        capacity = len(self._rowids)
+        if needed <= capacity:
+            return
+        capacity = min(max(needed, 2 * capacity, 1024), max(needed, self.max_entries + 1))
+        self._rowids = np.resize(self._rowids, capacity)
+        vectors = np.empty((capacity, self._vectors.shape[1]), dtype=np.float32)
+        vectors[:self._size] = self._vectors[:self._size]
+        self._vectors = vectors
+        self._expires_at = np.resize(self._expires_at, capacity)
+
+    def _append(self, rowid: int, vector: np.ndarray, label: str, expires_at: float) -> None:
+        self._reserve(self._size + 1)
+        self._rowids[self._size] = rowid
+        self._vectors[self._size] = vector
+        self._labels.append(label)
+        self._expires_at[self._size] = expires_at
+        self._size += 1
+
+    def embed(self, text: str) -> np.ndarray:
+        return self.embedder.encode(text, normalize_embeddings=True).astype(np.float32)
+
+    def lookup(self, query: np.ndarray) -> Optional[str]:
+        with self._lock:
+            n = self._size
+            if not n:
+                return None
+            scores = self._vectors[:n] @ query
+            scores[self._expires_at[:n] <= time.time()] = -np.inf  # Wall clock: expiries survive restarts
+            best = int(np.argmax(scores))
+            if scores[best] > self.threshold:
+                return self._labels[best]
+        return None
+
+    def insert(self, query: np.ndarray, label: str, ttl: float) -> None:
+        expires_at = time.time() + ttl
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT INTO entries (embedding, label, expires_at) VALUES (?, ?, ?)",
+                (query.tobytes(), label, expires_at),
+            )
+            self._append(cursor.lastrowid, query, label, expires_at)
+            if self._size > self.max_entries:
+                self._evict()
+            self._conn.commit()
+
+    def _evict(self) -> None:
+        """
+        Drop expired rows, then the oldest live ones down to SEMANTIC_EVICT_TO of capacity.
+        Compacting in bulk keeps eviction off the per-insert path. Caller holds the lock.
+        """
+        now = time.time()
+        n = self._size
+        keep = np.flatnonzero(self._expires_at[:n] > now)[-int(self.max_entries * SEMANTIC_EVICT_TO):]
+        self._conn.execute("DELETE FROM entries WHERE expires_at <= ?", (now,))
+        if len(keep) and keep[0] > 0:
+            self._conn.execute("DELETE FROM entries WHERE rowid < ?", (int(self._rowids[keep[0]]),))
+        size = len(keep)
+        self._rowids[:size] = self._rowids[keep]
+        self._vectors[:size] = self._vectors[keep]
+        self._labels = [self._labels[i] for i in keep]
+        self._expires_at[:size] = self._expires_at[keep]
+        self._size = size
+
+@st.cache_resource
+def get_semantic_cache() -> Optional[SemanticCache]:
+    """Load the embedder and stored entries once per process."""
+    if not HAVE_SENTENCE_TRANSFORMERS:
+        return None
+    return SemanticCache(SEMANTIC_CACHE_PATH, SentenceTransformer(EMBEDDING_MODEL))
+
+# VADER fast path: trust only clear-cut compound scores, escalate the rest
+VADER_CONFIDENT = 0.6  # |compound| at or above → positive/negative
+VADER_NEUTRAL = 0.05  # |compound| below → neutral
+
+@st.cache_resource
+def get_vader() -> Optional["SentimentIntensityAnalyzer"]:
+    return SentimentIntensityAnalyzer() if HAVE_VADER else None
+
+def vader_sentiments(texts: list[str]) -> list[Optional[str]]:
+    """Label each text locally, or None where VADER isn't confident (vectorized for batch mode)."""
+    analyzer = get_vader()
+    if analyzer is None:
+        return [None] * len(texts)
+    compound = np.fromiter((analyzer.polarity_scores(t)["compound"] for t in texts), dtype=np.float64, count=len(texts))
+    labels = np.select(
+        [compound >= VADER_CONFIDENT, compound <= -VADER_CONFIDENT, np.abs(compound) < VADER_NEUTRAL],
+        ["positive", "negative", "neutral"],
+        default="",
+    )
+    return [label or None for label in labels.tolist()]
+
+def lookup_local_sentiment(text: str, key: PromptKey, use_vader: bool = True) -> tuple[Optional[str], Optional[np.ndarray]]:
+    """
+    Check L1, then VADER, then L2, all without calling Gemini.
+    Also returns the embedding (if computed) for a later store.
+    """
+    exact_cache = get_sentiment_cache()
+    cached = exact_cache.get(key.digest)
+    if cached is not None:
+        return cached, None
+
+    if use_vader:
+        local = vader_sentiments([text])[0]
+        if local is not None:
+            return local, None
+
+    semantic_cache = get_semantic_cache()
+    if semantic_cache is None:
+        return None, None
+    query = semantic_cache.embed(key.normalized)
+    cached = semantic_cache.lookup(query)
+    if cached is not None:
+        exact_cache.set(key.digest, cached, key.ttl)
+    return cached, query
+
+def store_sentiment(key: PromptKey, sentiment: str, query: Optional[np.ndarray] = None) -> None:
+    """Write a fresh label to both cache layers."""
+    get_sentiment_cache().set(key.digest, sentiment, key.ttl)
+    semantic_cache = get_semantic_cache()
+    if semantic_cache is not None:
+        if query is None:
+            query = semantic_cache.embed(key.normalized)
+        semantic_cache.insert(query, sentiment, key.ttl)
+
+def generate_sentiment_aligned_text(sentiment: str, original_prompt: str, word_count: int = 200, style_mode: str = "ELI10", key: Optional[PromptKey] = None) -> Iterator[str]:
+    """
+    Stream generated text chunk by chunk. A cache hit yields the whole text at once;
+    a completed stream is cached, keyed on every input that shapes the output (adaptive TTL).
+    Trivial or oversized prompts raise ValueError here, before the generator is created.
     """
-    Analyze sentiment using enforced JSON mode for 99% reliability.
+    validate_prompt(original_prompt)
+    return _stream_cached(sentiment, original_prompt, word_count, style_mode, key or prompt_key(original_prompt))
+
+def _stream_cached(sentiment: str, original_prompt: str, word_count: int, style_mode: str, key: PromptKey) -> Iterator[str]:
+    digest = generation_digest(sentiment, key, word_count, style_mode)
+    generation_cache = get_generation_cache()
+    cached = generation_cache.get(digest)
+    if cached is not None:
+        yield cached
+        return
+
+    chunks = []
+    try:
+        for chunk in _stream_text(sentiment, original_prompt, word_count, style_mode):
+            chunks.append(chunk)
+            yield chunk
+    except Exception as e:
+        st.error(f"Error in text generation: {e}")
+        if not chunks:
+            yield "Generation failed. Please try again."
+        return  # Don't cache failures or partial text
+    generation_cache.set(digest, "".join(chunks).strip(), key.ttl)
+
+def _stream_text(sentiment: str, original_prompt: str, word_count: int, style_mode: str) -> Iterator[str]:
     """
-    if len(text.strip()) < 3:
-        return 'neutral'
-    
-    sentiment_prompt = f"""
-    Classify the sentiment of the following text as exactly one of: positive, negative, neutral.
-    
-    Text: {text}
+    No @gemini_retry here: a retry would replay from scratch. Restart with the same backoff only
+    when a transient error hits before the first token; anything else propagates.
     """
-    
-    # JSON Schema for enforced structure
-    json_schema = {
+    generation_model = get_generation_model(style_mode, sentiment)
+    user_prompt = PROMPT_BUILDERS[(style_mode, sentiment)](original_prompt, word_count)
+
+    for attempt in range(RETRY_ATTEMPTS):
+        started = False
+        try:
+            for chunk in generation_model.generate_content(user_prompt, stream=True):
+                if chunk.parts and chunk.text:  # .text raises on part-less chunks (e.g. the final one)
+                    started = True
+                    yield chunk.text
+            if not started:
+                raise ValueError("Empty response from Gemini")
+            return
+        except TRANSIENT_ERRORS as e:
+            if started or not should_retry(attempt, e):
+                raise
+            time.sleep(backoff_delay(attempt, e))
+
+def generation_digest(sentiment: str, key: PromptKey, word_count: int, style_mode: str) -> str:
+    """Cache key over every input that shapes the output; the prompt enters as its digest."""
+    return cache_digest((model_name, sentiment, key.digest, word_count, style_mode))
+
+def generate_fused(original_prompt: str, word_count: int = 200, style_mode: str = "ELI10", query: Optional[np.ndarray] = None, key: Optional[PromptKey] = None) -> dict:
+    """
+    Auto-detect mode in one Gemini call: classify sentiment and write the aligned text together.
+    Returns {"sentiment": ..., "text": ...}. Call only after lookup_local_sentiment misses
+    (pass its embedding as `query`); a cached sentiment should take the streaming path instead.
+    Trivial or oversized prompts raise ValueError; Gemini failures return a fallback result.
+    """
+    validate_prompt(original_prompt)
+
+    try:
+        result = _generate_fused(original_prompt, word_count, style_mode)
+    except Exception as e:
+        st.error(f"Error in text generation: {e}")
+        return {"sentiment": "neutral", "text": "Generation failed. Please try again."}  # Don't cache failures
+    key = key or prompt_key(original_prompt)
+    store_sentiment(key, result["sentiment"], query)
+    store_generation(result["sentiment"], key, word_count, style_mode, result["text"])
+    return result
+
+def store_generation(sentiment: str, key: PromptKey, word_count: int, style_mode: str, generated_text: str) -> None:
+    get_generation_cache().set(generation_digest(sentiment, key, word_count, style_mode), generated_text, key.ttl)
+
+# JSON Schema for the fused call: sentiment first, then the text
+FUSED_GENERATION_CONFIG = {
+    "response_mime_type": "application/json",
+    "response_schema": {
         "type": "object",
         "properties": {
             "sentiment": {
                 "type": "string",
                 "enum": ["positive", "negative", "neutral"]
-            }
+            },
+            "text": {"type": "string"}
         },
-        "required": ["sentiment"]
+        "required": ["sentiment", "text"]
     }
-    
-    try:
-        response = model.generate_content(
-            sentiment_prompt,
-            generation_config={
-                "response_mime_type": "application/json",  # Forces JSON
-                "response_schema": json_schema  # Enforces exact format
-            }
-        )
-        if not response.text.strip():
-            raise ValueError("Empty response from Gemini")
-        result = json.loads(response.text.strip())
-        return result.get("sentiment", "neutral").lower()
-    except (json.JSONDecodeError, ValueError, Exception) as e:
-        st.error(f"Error in sentiment analysis: {e}")
-        return 'neutral'
-
-@retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=4, max=10))
-def generate_sentiment_aligned_text(sentiment: str, original_prompt: str, word_count: int = 200, style_mode: str = "ELI10") -> str:
+}
+
+def parse_fused_response(response_text: str) -> dict:
+    """Validate fused JSON output into {"sentiment": ..., "text": ...}."""
+    result = json.loads(response_text)
+    if not result.get("text", "").strip():
+        raise ValueError("Empty text in Gemini response")
+    return {"sentiment": result.get("sentiment", "neutral").lower(), "text": result["text"].strip()}
+
+@gemini_retry
+def _generate_fused(original_prompt: str, word_count: int, style_mode: str) -> dict:
+    """
+    Single JSON-mode call: sentiment first, then text written under that sentiment's guidelines.
+    """
+    fused_model = get_generation_model(style_mode, FUSED)
+
+    response = fused_model.generate_content(
+        PROMPT_BUILDERS[(style_mode, FUSED)](original_prompt, word_count),
+        generation_config=FUSED_GENERATION_CONFIG
+    )
+    if not response.text.strip():
+        raise ValueError("Empty response from Gemini")
+    return parse_fused_response(response.text.strip())
+
+# Batch mode: N prompts in ~1 RTT of wall-clock, bounded by a semaphore to respect per-minute quotas
+BATCH_CONCURRENCY = 8
+
+@st.cache_resource
+def get_event_loop() -> asyncio.AbstractEventLoop:
     """
-    Enhanced with structured constraints in prompt, including ELI10 style for simple, fun explanations.
+    One long-lived loop on a daemon thread. The cached models' async clients bind to the loop
+    they were first used on, so a fresh asyncio.run() per batch would leave them on a closed loop.
+    """
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, daemon=True).start()
+    return loop
+
+@st.cache_resource
+def get_batch_semaphore() -> asyncio.Semaphore:
+    """Process-wide cap on in-flight Gemini calls, shared by every batch in every session."""
+    async def create() -> asyncio.Semaphore:
+        return asyncio.Semaphore(BATCH_CONCURRENCY)  # Created on the batch loop it will be used from
+    return asyncio.run_coroutine_threadsafe(create(), get_event_loop()).result()
+
+@gemini_retry  # tenacity switches to asyncio.sleep for coroutines
+async def _gen_async(generation_model: genai.GenerativeModel, prompt: str, generation_config: Optional[dict] = None) -> str:
+    response = await generation_model.generate_content_async(prompt, generation_config=generation_config)
+    if not response.text.strip():
+        raise ValueError("Empty response from Gemini")
+    return response.text.strip()
+
+async def _run_batch(jobs: list[tuple], semaphore: asyncio.Semaphore) -> list:
+    """Run (model, prompt, generation_config) jobs concurrently; exceptions are returned, not raised."""
+    async def bounded(generation_model, prompt, generation_config):
+        async with semaphore:
+            return await _gen_async(generation_model, prompt, generation_config)
+
+    return await asyncio.gather(*[bounded(*job) for job in jobs], return_exceptions=True)
+
+def generate_batch(prompts: list[str], word_count: int = 200, style_mode: str = "ELI10", sentiment: Optional[str] = None) -> list[dict]:
+    """
+    Generate for many prompts concurrently. `sentiment=None` auto-detects per prompt (fused call on cache miss).
+    Returns one {"prompt", "sentiment", "text", "error"} dict per prompt, in order.
+    Cache lookups and writes stay on the script thread; only the Gemini calls run on the batch loop.
+    """
+    results = []
+    pending = []  # (result index, prompt key, embedding for the sentiment cache)
+    jobs = []
+    length_errors = [prompt_length_error(p) for p in prompts]  # Checked before any VADER or cache work
+    valid_prompts = [p for p, error in zip(prompts, length_errors) if not error]
+    local_sentiments = iter([sentiment] * len(valid_prompts) if sentiment else vader_sentiments(valid_prompts))
+    for original_prompt, length_error in zip(prompts, length_errors):
+        if length_error:
+            results.append({"prompt": original_prompt, "sentiment": sentiment or "neutral", "text": "", "error": length_error})
+            continue
+        prompt_sentiment = next(local_sentiments)
+        key = prompt_key(original_prompt)
+        query = None
+        if prompt_sentiment is None:
+            prompt_sentiment, query = lookup_local_sentiment(original_prompt, key, use_vader=False)
+        if prompt_sentiment is not None:
+            cached = get_generation_cache().get(generation_digest(prompt_sentiment, key, word_count, style_mode))
+            if cached is not None:
+                results.append({"prompt": original_prompt, "sentiment": prompt_sentiment, "text": cached, "error": None})
+                continue
+        if prompt_sentiment is None:
+            user_prompt = PROMPT_BUILDERS[(style_mode, FUSED)](original_prompt, word_count)
+            jobs.append((get_generation_model(style_mode, FUSED), user_prompt, FUSED_GENERATION_CONFIG))
+        else:
+            user_prompt = PROMPT_BUILDERS[(style_mode, prompt_sentiment)](original_prompt, word_count)
+            jobs.append((get_generation_model(style_mode, prompt_sentiment), user_prompt, None))
+        pending.append((len(results), key, query))
+        results.append({"prompt": original_prompt, "sentiment": prompt_sentiment, "text": None, "error": None})
+
+    responses = asyncio.run_coroutine_threadsafe(_run_batch(jobs, get_batch_semaphore()), get_event_loop()).result() if jobs else []
+    for (index, key, query), response in zip(pending, responses):
+        item = results[index]
+        try:
+            if isinstance(response, BaseException):
+                raise response
+            if item["sentiment"] is None:
+                fused = parse_fused_response(response)
+                item["sentiment"], item["text"] = fused["sentiment"], fused["text"]
+                store_sentiment(key, item["sentiment"], query)
+            else:
+                item["text"] = response
+        except Exception as e:
+            item.update(sentiment=item["sentiment"] or "neutral", text="Generation failed. Please try again.", error=str(e))
+            continue  # Don't cache failures
+        store_generation(item["sentiment"], key, word_count, style_mode, item["text"])
+    return results
+
+# Sidebar labels and short names → canonical style (one lookup instead of string munging per call)
+STYLE_MODES = {
+    "ELI10 (Fun & Emojis)": "ELI10",
+    "Normal (Formal)": "Normal",
+    "ELI10": "ELI10",
+    "eli10": "ELI10",
+    "Normal": "Normal",
+    "normal": "Normal",
+}
+
+SENTIMENTS = ("positive", "negative", "neutral")
+FUSED = "auto"  # Pseudo-sentiment key for the fused Auto-detect model
+
+def base_instructions(tone: str) -> str:
+    """Instructions common to both modes and every sentiment (structure, word count, hook/close)."""
+    return f"""
+    Task: Generate a coherent paragraph (under 150 words) or short essay (150+ words) based on the original prompt.
+    - Strictly maintain {tone} tone.
+    - Hit the requested word count (±20).
+    - Engaging and natural; structure: Start with a hook related to the prompt, develop 2-3 key ideas, and end with a reflective close.
+    """
+
+# Style guidance shared by every sentiment in that mode
+STYLE_GUIDES = {
+    # ELI10 mode: Kid-friendly, fun, with jokes/emojis
+    "ELI10": """
+        - In ELI10 style: Explain like you're talking to a 10-year-old—use simple words, short sentences, fun examples, and easy ideas anyone can get. Avoid big words or boring facts; make it feel like a story or chat with a kid.
+        """,
+    # Normal mode: Formal, professional tone without ELI10/jokes/emojis
+    "Normal": """
+        - Use a formal, professional tone suitable for adults: Clear, concise language with varied sentence structure. No slang, jokes, or emojis.
+        """,
+}
+
+# Sentiment-specific ELI10 enhancements
+ELI10_FLAIR = {
+    "positive": "Add 3-5 fun jokes or puns to make it hilarious, and sprinkle in lots of excited emojis (like 😄, 🚀, 🎉) throughout to amp up the joy!",
+    "negative": "Weave in 2-3 dark humor jokes or ironic twists to heighten the gloom, and use grumpy/sad emojis (like 😞, 🌧️, 💔) to match the vibe.",
+    "neutral": "Keep it balanced with 2-3 light, observational jokes if they fit naturally, and add neutral emojis (like 📖, 🌤️, 🤔) sparingly for visual pop.",
+}
+
+def build_system_instruction(sentiment: str, style_mode: str = "ELI10", include_examples: bool = True) -> str:
+    """
+    Static guidance sent as the model's system_instruction, so Gemini can cache the prefix server-side.
+    Enhanced with structured constraints, including ELI10 style for simple, fun explanations.
     Adds sentiment-specific flair: jokes & emojis for positive; appropriate emojis for negative/neutral.
     Supports 'ELI10' (fun, kid-friendly with jokes/emojis) or 'Normal' (formal, engaging without extras).
     """
     # Normalize mode (fix for lowercase/mismatch)
-    style_mode = style_mode.upper().replace(" (FUN & EMOJIS)", "").strip()  # Handles "eli10" → "ELI10", etc.
-    
-    # Base instructions common to both modes
-    base_instructions = f"""
-    Task: Generate a coherent { 'paragraph' if word_count < 150 else 'short essay' } based on the original prompt.
-    - Strictly maintain {sentiment} tone.
-    - Exactly {word_count} words (±20).
-    - Engaging and natural; structure: Start with a hook related to the prompt, develop 2-3 key ideas, and end with a reflective close.
-    """
+    style_mode = STYLE_MODES.get(style_mode, "Normal")
 
+    system_instruction = base_instructions(sentiment) + STYLE_GUIDES[style_mode]
     if style_mode == "ELI10":
-        # ELI10 mode: Kid-friendly, fun, with jokes/emojis
-        flair = f"""
-        - In ELI10 style: Explain like you're talking to a 10-year-old—use simple words, short sentences, fun examples, and easy ideas anyone can get. Avoid big words or boring facts; make it feel like a story or chat with a kid.
-        """
-        # Sentiment-specific enhancements
-        if sentiment == "positive":
-            extra_flair = "Add 3-5 fun jokes or puns to make it hilarious, and sprinkle in lots of excited emojis (like 😄, 🚀, 🎉) throughout to amp up the joy!"
-        elif sentiment == "negative":
-            extra_flair = "Weave in 2-3 dark humor jokes or ironic twists to heighten the gloom, and use grumpy/sad emojis (like 😞, 🌧️, 💔) to match the vibe."
-        else:  # neutral
-            extra_flair = "Keep it balanced with 2-3 light, observational jokes if they fit naturally, and add neutral emojis (like 📖, 🌤️, 🤔) sparingly for visual pop."
-        
-        generation_prompt = base_instructions + flair + f" - {extra_flair}\n\nExamples:\n" + get_eli10_examples(sentiment)
+        system_instruction += f" - {ELI10_FLAIR.get(sentiment, ELI10_FLAIR['neutral'])}\n"
+        examples = get_eli10_examples(sentiment)
     else:
-        # Normal mode: Formal, professional tone without ELI10/jokes/emojis
-        extra_flair = """
-        - Use a formal, professional tone suitable for adults: Clear, concise language with varied sentence structure. No slang, jokes, or emojis.
-        """
-        generation_prompt = base_instructions + extra_flair + "\n\nExamples:\n" + get_normal_examples(sentiment)
+        examples = get_normal_examples(sentiment)
 
-    generation_prompt += f"\nOriginal Prompt: {original_prompt}"
-    
-    try:
-        response = model.generate_content(generation_prompt)
-        if not response.text.strip():
-            raise ValueError("Empty response from Gemini")
-        return response.text.strip()
-    except (ValueError, Exception) as e:
-        st.error(f"Error in text generation: {e}")
-        return "Generation failed. Please try again."
+    if include_examples:
+        system_instruction += "\nExample:\n" + examples
+    return system_instruction
 
-def get_eli10_examples(sentiment: str) -> str:
-    """Return ELI10 examples based on sentiment."""
-    examples = {
-        "positive": """
+def build_fused_system_instruction(style_mode: str = "ELI10") -> str:
+    """
+    System instruction for the fused call: classify first, then write in that sentiment's tone.
+    Shared guidance appears once and only the per-sentiment flair is listed; no few-shot examples,
+    which would otherwise be repeated for all three sentiments.
+    """
+    style_mode = STYLE_MODES.get(style_mode, "Normal")
+    system_instruction = """
+    Step 1: Classify the sentiment of the original prompt as exactly one of: positive, negative, neutral.
+    Step 2: Write the text following the shared guidelines and ONLY the flair for the sentiment you detected.
+    Return JSON with "sentiment" and "text".
+    """ + base_instructions("the detected sentiment's") + STYLE_GUIDES[style_mode]
+    if style_mode == "ELI10":
+        for sentiment in SENTIMENTS:
+            system_instruction += f"\n--- Guidelines if {sentiment} ---\n - {ELI10_FLAIR[sentiment]}\n"
+    return system_instruction
+
+def make_prompt_builder(style_mode: str, sentiment: str) -> Callable[[str, int], str]:
+    """
+    User-turn builder with its constant prefix captured once; the per-request part is a single f-string.
+    """
+    tone = "detect from the prompt" if sentiment == FUSED else sentiment
+    prefix = f"Style: {style_mode} | Tone: {tone}\n"
+
+    def build(original_prompt: str, word_count: int) -> str:
+        return f"{prefix}Word count: {word_count}\nOriginal Prompt: {original_prompt}"
+
+    return build
+
+# Few-shot examples, built once at import
+ELI10_EXAMPLES = {
+    "positive": """
     - Original (positive): "I love sunny days at the beach."
       Generated (positive): "Imagine the sun smiling down on the beach, making everything warm and sparkly like a giant hug from the sky 😄! You can splash in the waves that tickle your toes and build the tallest sandcastles ever—watch out, or the tide might say, 'Hey, that's my moat!' 😂. Kids everywhere are giggling and chasing seagulls—it's like the world's best playground 🎉! And at the end of the day, as the sun says goodnight with pretty colors, you feel super happy inside, ready for more adventures tomorrow 🚀. Why did the beach ball go to school? To get a little 'shore' education! 🌅"
         """,
-        "negative": """
+    "negative": """
     - Original (negative): "Traffic jams ruin my commute."
       Generated (negative): "Ugh, picture being stuck in a huge line of cars, like a boring game where nobody moves 😞. The engine grumbles like a grumpy monster, and the clock just laughs at you while time drags on forever—talk about a 'traffic' light that never turns green! 🌧️. Horns beep like angry birds, and you're trapped with nowhere to go, making everything feel extra yucky and slow 💔. It's like the cars are having a never-ending staring contest. Why don't traffic jams ever break up? They're just too 'jammed' together! 😤 At least when you finally get home, you can sigh and say, 'Better luck tomorrow... maybe.'"
         """,
-        "neutral": """
+    "neutral": """
     - Original (neutral): "The weather today is mild."
       Generated (neutral): "Today's weather is just right, not too hot or too cold—like wearing your favorite cozy sweater outside 🌤️. Clouds float by like fluffy sheep, and the breeze is gentle, perfect for kicking a ball or reading a book under a tree 📖. It's a normal day where you can do whatever you want without sweating or shivering, keeping things simple and easy 🤔. Why did the cloud go to school? To get a little 'higher' education! ☁️ Either way, it's a chill day—no drama, just steady and nice, like your best buddy who's always there without stealing the show."
         """
-    }
-    return examples.get(sentiment, examples["neutral"])
+}
 
-def get_normal_examples(sentiment: str) -> str:
-    """Return Normal mode examples based on sentiment."""
-    examples = {
-        "positive": """
+NORMAL_EXAMPLES = {
+    "positive": """
     - Original (positive): "I love sunny days at the beach."
       Generated (positive): "Sunny days at the beach evoke a profound sense of joy and relaxation. The golden sunlight bathes the shoreline in warmth, creating an ideal setting for leisurely walks along the water's edge. Families gather to enjoy the rhythmic crash of waves, while the gentle sea breeze carries the faint scent of salt and sunscreen. Such moments remind us of nature's ability to recharge the spirit, fostering connections with loved ones and inspiring a deeper appreciation for life's simple pleasures."
         """,
-        "negative": """
+    "negative": """
     - Original (negative): "Traffic jams ruin my commute."
       Generated (negative): "Traffic jams transform an ordinary commute into an exasperating ordeal, marked by stagnation and mounting irritation. Vehicles inch forward amid the cacophony of impatient horns, while exhaust fumes thicken the air, amplifying the sense of confinement. Precious time slips away in this involuntary standstill, disrupting schedules and eroding productivity. Ultimately, these delays underscore the vulnerabilities of urban mobility, leaving commuters drained and resentful upon arrival."
         """,
-        "neutral": """
+    "neutral": """
     - Original (neutral): "The weather today is mild."
       Generated (neutral): "The current weather conditions are mild, characterized by moderate temperatures and low humidity. This equilibrium supports a variety of daily activities, from outdoor errands to indoor pursuits, without the discomfort of extremes. Light cloud cover provides intermittent shade, and a subtle breeze maintains comfort levels. Overall, it presents an unremarkable yet conducive environment for routine proceedings."
         """
-    }
-    return examples.get(sentiment, examples["neutral"])
+}
+
+def get_eli10_examples(sentiment: str) -> str:
+    """Return ELI10 examples based on sentiment."""
+    return ELI10_EXAMPLES.get(sentiment, ELI10_EXAMPLES["neutral"])
+
+def get_normal_examples(sentiment: str) -> str:
+    """Return Normal mode examples based on sentiment."""
+    return NORMAL_EXAMPLES.get(sentiment, NORMAL_EXAMPLES["neutral"])
+
+@st.cache_resource
+def get_prompt_tables() -> tuple[dict, dict]:
+    """
+    Prompt tables built once per process: every style label (sidebar or short) × sentiment
+    (FUSED = Auto-detect variant). Request time is a dict lookup, with no style normalization
+    or template building per call.
+    """
+    system_instructions = {}  # (style label, sentiment, include_examples) -> system_instruction
+    prompt_builders = {}  # (style label, sentiment) -> builder(original_prompt, word_count)
+    for style in set(STYLE_MODES.values()):
+        labels = [label for label, canonical in STYLE_MODES.items() if canonical == style]
+        for sentiment in SENTIMENTS + (FUSED,):
+            builder = make_prompt_builder(style, sentiment)
+            for include_examples in (True, False):
+                if sentiment == FUSED:
+                    instruction = build_fused_system_instruction(style)  # Never carries examples
+                else:
+                    instruction = build_system_instruction(sentiment, style, include_examples)
+                for label in labels:
+                    system_instructions[(label, sentiment, include_examples)] = instruction
+            for label in labels:
+                prompt_builders[(label, sentiment)] = builder
+    return system_instructions, prompt_builders
+
+SYSTEM_INSTRUCTIONS, PROMPT_BUILDERS = get_prompt_tables()
+
+def get_generation_model(style_mode: str, sentiment: str) -> genai.GenerativeModel:
+    """
+    Cached model for the selected Gemini model that already carries the static prompt prefix.
+    Pro follows the instructions without few-shot text; Flash keeps one example per sentiment.
+    """
+    include_examples = model_name != "gemini-2.5-pro"
+    return get_model(model_name, SYSTEM_INSTRUCTIONS[(style_mode, sentiment, include_examples)])
+
+# PDF/TXT export; st.download_button (streamlit 1.50) needs the bytes at render time
+EXPORT_MIME, EXPORT_EXT = ("application/pdf", "pdf") if HAVE_REPORTLAB else ("text/plain", "txt")
+
+def export_filename(sentiment: str, style_mode: str) -> str:
+    return f"sentiment_text_{sentiment}_{style_mode.lower().replace(' ', '_')}_{time.strftime('%Y%m%d_%H%M%S')}.{EXPORT_EXT}"
+
+@st.cache_data(show_spinner=False)
+def create_export(original_prompt: str, sentiment: str, style_mode: str, generated_text: str) -> bytes:
+    """A styled PDF, or plain text when reportlab is missing (see EXPORT_MIME). Memoized per result."""
+    gen_word_count = len(generated_text.split())
+    if HAVE_REPORTLAB:
+        buffer = io.BytesIO()
+        doc = SimpleDocTemplate(buffer, pagesize=letter)
+        styles = getSampleStyleSheet()
+
+        # Custom style for title with color
+        title_style = ParagraphStyle(
+            'CustomTitle',
+            parent=styles['Heading1'],
+            fontSize=20,
+            spaceAfter=30,
+            alignment=1,  # Center
+            textColor=HexColor('#1f77b4')  # Blue color
+        )
+
+        # Custom normal style with better font
+        normal_style = ParagraphStyle(
+            'CustomNormal',
+            parent=styles['Normal'],
+            fontSize=11,
+            spaceAfter=12,
+            textColor=HexColor('#333333')
+        )
+
+        story = []
+        story.append(Paragraph("🤖 AI Sentiment Text Generator", title_style))
+        story.append(Spacer(1, 0.3 * inch))
+        story.append(Paragraph(f"<b>Original Prompt:</b> {escape(original_prompt)}", normal_style))
+        story.append(Spacer(1, 0.15 * inch))
+        story.append(Paragraph(f"<b>Sentiment:</b> {sentiment}", normal_style))
+        story.append(Spacer(1, 0.15 * inch))
+        story.append(Paragraph(f"<b>Style:</b> {style_mode}", normal_style))
+        story.append(Spacer(1, 0.3 * inch))
+        story.append(Paragraph("<b>Generated Text:</b>", styles['Heading2']))
+        story.append(Spacer(1, 0.15 * inch))
+        story.append(Paragraph(escape(generated_text), normal_style))
+        story.append(Spacer(1, 0.4 * inch))
+        story.append(Paragraph(f"Generated on {time.strftime('%Y-%m-%d %H:%M:%S')} | ~{gen_word_count} words", styles['Italic']))
+
+        doc.build(story)
+        buffer.seek(0)
+        return buffer.getvalue()
+    else:
+        # Fallback: Plain text file
+        fallback_text = f"AI Sentiment Text Generator\n\nOriginal Prompt: {original_prompt}\nSentiment: {sentiment}\nStyle: {style_mode}\n\nGenerated Text:\n{generated_text}\n\nGenerated on {time.strftime('%Y-%m-%d %H:%M:%S')} | ~{gen_word_count} words"
+        return fallback_text.encode('utf-8')
 
 # Streamlit UI
 st.set_page_config(page_title="AI Sentiment Text Generator", page_icon="🤖", layout="wide")
@@ -212,29 +839,40 @@ original_prompt = st.text_area(
     key="prompt_input"  # For clear functionality
 )
 
-# Clear button
-if st.button("🗑️ Clear Prompt", type="secondary"):
-    st.rerun()
+# Clear button: reset the keyed text area in a callback (runs before the rerun, no extra st.rerun())
+st.button("🗑️ Clear Prompt", type="secondary", on_click=lambda: st.session_state.update(prompt_input=""))
 
 # Generate button with Style Mode integration
 col_gen1, col_gen2 = st.columns([3, 1])
 with col_gen1:
     if st.button("🚀 Generate Text", type="primary", use_container_width=True, key="generate"):
-        if original_prompt.strip():
-            # Sentiment logic
+        # Sentiment logic; validate_prompt and both generation entry points raise ValueError for unusable prompts
+        generated_text = stream = None
+        try:
+            validate_prompt(original_prompt)  # Before any cache, VADER or embedding work
+            # Fixed: Pass cleaned style_mode
+            clean_style = STYLE_MODES[style_mode]
+            key = prompt_key(original_prompt)  # Normalized + hashed once for every cache layer
+
             if manual_sentiment == "Manual":
                 sentiment = selected_sentiment
+            else:
+                sentiment, query = lookup_local_sentiment(original_prompt, key)
+                if sentiment is None:
+                    # Auto-detect: one fused call instead of sentiment + generation round-trips (JSON mode, not streamed)
+                    with st.spinner("🔍 Analyzing sentiment & ✨ generating aligned text..."):
+                        result = generate_fused(original_prompt, word_count, clean_style, query, key)
+                    sentiment, generated_text = result["sentiment"], result["text"]
+            if generated_text is None:
+                stream = generate_sentiment_aligned_text(sentiment, original_prompt, word_count, clean_style, key)
+        except ValueError as e:
+            st.warning(str(e))
+        else:
+            if manual_sentiment == "Manual":
                 st.info(f"Using manual sentiment: **{sentiment}**")
             else:
-                with st.spinner("🔍 Analyzing sentiment..."):
-                    sentiment = get_sentiment(original_prompt)
                 st.success(f"Detected Sentiment: **{sentiment}**")
 
-            with st.spinner("✨ Generating aligned text..."):
-                # Fixed: Pass cleaned style_mode
-                clean_style = "ELI10" if "ELI10" in style_mode.upper() else "Normal"
-                generated_text = generate_sentiment_aligned_text(sentiment, original_prompt, word_count, clean_style)
-
             # Display
             col1, col2 = st.columns([1, 3])
             with col1:
@@ -244,7 +882,16 @@ with col_gen1:
                 st.markdown(f"**Style:** {style_mode}")
             with col2:
                 st.markdown("### 🎨 Generated Text")
-                st.write(generated_text)
+                placeholder = st.empty()
+                if stream is not None:
+                    # Render tokens as they arrive (time-to-first-token instead of full completion)
+                    buf = ""
+                    for chunk in stream:
+                        buf += chunk
+                        placeholder.markdown(buf)
+                    generated_text = buf.strip()
+                else:
+                    placeholder.markdown(generated_text)
             
             gen_word_count = len(generated_text.split())
             st.caption(f"Generated ~{gen_word_count} words")
@@ -252,75 +899,40 @@ with col_gen1:
             # Export/Share Feature
             st.markdown("### 📤 Export Options")
             
-            # Download as PDF (robust: try import, fallback to TXT)
-            def create_export():
-                try:
-                    from reportlab.lib.pagesizes import letter
-                    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
-                    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-                    from reportlab.lib.units import inch
-                    from reportlab.lib.colors import HexColor
-                    import io
-                
-                    buffer = io.BytesIO()
-                    doc = SimpleDocTemplate(buffer, pagesize=letter)
-                    styles = getSampleStyleSheet()
-                
-                    # Custom style for title with color
-                    title_style = ParagraphStyle(
-                        'CustomTitle',
-                        parent=styles['Heading1'],
-                        fontSize=20,
-                        spaceAfter=30,
-                        alignment=1,  # Center
-                        textColor=HexColor('#1f77b4')  # Blue color
-                    )
-                
-                    # Custom normal style with better font
-                    normal_style = ParagraphStyle(
-                        'CustomNormal',
-                        parent=styles['Normal'],
-                        fontSize=11,
-                        spaceAfter=12,
-                        textColor=HexColor('#333333')
-                    )
-                
-                    story = []
-                    story.append(Paragraph("🤖 AI Sentiment Text Generator", title_style))
-                    story.append(Spacer(1, 0.3 * inch))
-                    story.append(Paragraph(f"<b>Original Prompt:</b> {original_prompt}", normal_style))
-                    story.append(Spacer(1, 0.15 * inch))
-                    story.append(Paragraph(f"<b>Sentiment:</b> {sentiment}", normal_style))
-                    story.append(Spacer(1, 0.15 * inch))
-                    story.append(Paragraph(f"<b>Style:</b> {style_mode}", normal_style))
-                    story.append(Spacer(1, 0.3 * inch))
-                    story.append(Paragraph("<b>Generated Text:</b>", styles['Heading2']))
-                    story.append(Spacer(1, 0.15 * inch))
-                    story.append(Paragraph(generated_text, normal_style))
-                    story.append(Spacer(1, 0.4 * inch))
-                    story.append(Paragraph(f"Generated on {time.strftime('%Y-%m-%d %H:%M:%S')} | ~{gen_word_count} words", styles['Italic']))
-                
-                    doc.build(story)
-                    buffer.seek(0)
-                    return buffer.getvalue(), "application/pdf", f"sentiment_text_{sentiment}_{style_mode.lower().replace(' ', '_')}_{time.strftime('%Y%m%d_%H%M%S')}.pdf"
-                except ImportError:
-                    # Fallback: Plain text file
-                    fallback_text = f"AI Sentiment Text Generator\n\nOriginal Prompt: {original_prompt}\nSentiment: {sentiment}\nStyle: {style_mode}\n\nGenerated Text:\n{generated_text}\n\nGenerated on {time.strftime('%Y-%m-%d %H:%M:%S')} | ~{gen_word_count} words"
-                    return fallback_text.encode('utf-8'), "text/plain", f"sentiment_text_{sentiment}_{style_mode.lower().replace(' ', '_')}_{time.strftime('%Y%m%d_%H%M%S')}.txt"
-            
-            data, mime, filename = create_export()
+            # Download as PDF (fallback to TXT); rebuilt only when the generated result changes
             st.download_button(
-                label=f"💾 Download as PDF 📄" if "pdf" in filename.lower() else "💾 Download as TXT 📄",
-                data=data,
-                file_name=filename,
-                mime=mime,
+                label=f"💾 Download as {EXPORT_EXT.upper()} 📄",
+                data=create_export(original_prompt, sentiment, style_mode, generated_text),
+                file_name=export_filename(sentiment, style_mode),
+                mime=EXPORT_MIME,
                 type="primary",
-                use_container_width=True
+                use_container_width=True,
+                on_click="ignore"  # No rerun, so the generated text stays on screen
             )
-            if "pdf" not in filename.lower():
+            if not HAVE_REPORTLAB:
                 st.warning("💡 PDF needs 'reportlab'—installed? Falling back to TXT for now.")
+
+# Batch mode: one prompt per line, generated concurrently
+with st.expander("📚 Batch Mode"):
+    batch_input = st.text_area(
+        "✍️ Enter one prompt per line",
+        placeholder="I love exploring new cities!\nMondays are exhausting.",
+        height=150,
+        key="batch_input"
+    )
+    if st.button("🚀 Generate Batch", key="generate_batch"):
+        batch_prompts = [line.strip() for line in batch_input.splitlines() if line.strip()]
+        if batch_prompts:
+            with st.spinner(f"✨ Generating {len(batch_prompts)} texts..."):
+                results = generate_batch(batch_prompts, word_count, STYLE_MODES[style_mode], selected_sentiment)
+            for item in results:
+                st.markdown(f"**📝 {item['prompt']}** · Sentiment: **{item['sentiment']}**")
+                if item["error"]:
+                    st.error(f"Error in text generation: {item['error']}")
+                st.write(item["text"])
+                st.markdown("---")
         else:
-            st.warning("Please enter a prompt.")
+            st.warning("Please enter at least one prompt.")
 
 # Footer
 st.markdown("---")